@@ -0,0 +1,354 @@
+import functools
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+import pdfplumber
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+try:  # OCR opzionale per PDF scansionati
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# ======================================================
+# CONFIG
+# ======================================================
+# Relativa alla cartella di lavoro. Un file per PDF analizzato: oltre
+# PDF_CACHE_MAX_FILES si eliminano i meno usati (mtime aggiornato ad ogni hit)
+PDF_CACHE_DIR = "pdf_cache"
+PDF_CACHE_MAX_FILES = 500
+# Da incrementare quando cambia la logica di estrazione (invalida la cache)
+CACHE_VERSION = "1"
+
+# Caratteri per 1000 pt² di pagina: sotto la soglia minima la pagina è
+# considerata scansionata, sotto quella del testo "pieno" si usa il layout.
+MIN_TEXT_DENSITY = 0.05
+FULL_TEXT_DENSITY = 0.5
+# Una pagina è trattata come tabella solo se ha una griglia: almeno tante
+# righe orizzontali e verticali sottili (filetti isolati, bordi e loghi no)
+MIN_GRID_LINES = 3
+RULE_MAX_THICKNESS = 3.0
+RULE_MIN_LENGTH = 10.0
+OCR_SCALE = 300 / 72
+
+# pdfium non è thread-safe (nemmeno tra documenti diversi) e Streamlit
+# esegue ogni sessione in un thread dello stesso processo
+PDFIUM_LOCK = threading.RLock()
+
+
+# ======================================================
+# BACKENDS
+# ======================================================
+class OcrUnavailable(Exception):
+    """OCR non eseguibile (pytesseract/tesseract mancanti o in errore)."""
+
+
+class PdfBackend(ABC):
+    """Interfaccia comune: estrae il testo di una singola pagina."""
+
+    name = "base"
+
+    @abstractmethod
+    def extract_page(self, doc, index):
+        """Ritorna il testo della pagina `index` di un PdfDocument."""
+
+
+class TextLayerBackend(PdfBackend):
+    """Lettura diretta del text layer con pdfium, senza analisi del layout."""
+
+    name = "text"
+
+    def extract_page(self, doc, index):
+        with PDFIUM_LOCK:
+            page = doc.pdfium[index]
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+                page.close()
+
+
+class LayoutBackend(PdfBackend):
+    """Estrazione pdfplumber con analisi del layout (comportamento storico)."""
+
+    name = "layout"
+
+    def extract_page(self, doc, index):
+        return doc.plumber.pages[index].extract_text() or ""
+
+
+class TableBackend(PdfBackend):
+    """Come LayoutBackend, ma le tabelle di specifiche diventano righe 'col | col'."""
+
+    name = "table"
+
+    def extract_page(self, doc, index):
+        page = doc.plumber.pages[index]
+        tables = page.find_tables()
+        if not tables:
+            return page.extract_text() or ""
+
+        def in_table(obj):
+            x = (obj["x0"] + obj["x1"]) / 2
+            y = (obj["top"] + obj["bottom"]) / 2
+            return any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in bboxes)
+
+        # Si scartano solo i caratteri con il centro dentro una tabella, così
+        # il testo adiacente non viene troncato
+        bboxes = [t.bbox for t in tables]
+        outside = page.filter(lambda obj: obj.get("object_type") != "char" or not in_table(obj))
+
+        # Righe di testo e tabelle serializzate, nell'ordine in cui compaiono
+        blocks = [(line["top"], line["text"]) for line in outside.extract_text_lines()]
+        for table in tables:
+            rows = []
+            for row in table.extract():
+                cells = [" ".join((c or "").split()) for c in row]
+                if any(cells):
+                    rows.append(" | ".join(cells))
+            blocks.append((table.bbox[1], "\n".join(rows)))
+        blocks.sort(key=lambda b: b[0])
+        return "\n".join(text for _, text in blocks if text.strip())
+
+
+class OcrBackend(PdfBackend):
+    """OCR della pagina renderizzata (richiede pytesseract); solleva OcrUnavailable."""
+
+    name = "ocr"
+
+    def extract_page(self, doc, index):
+        if not ocr_available():
+            raise OcrUnavailable("tesseract non disponibile")
+        with PDFIUM_LOCK:
+            page = doc.pdfium[index]
+            try:
+                image = page.render(scale=OCR_SCALE).to_pil()
+            finally:
+                page.close()
+        try:
+            return pytesseract.image_to_string(image, lang="ita+eng")
+        except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+            raise OcrUnavailable(str(e)) from e
+
+
+@functools.lru_cache(maxsize=1)
+def ocr_available():
+    """True se pytesseract è installato e trova l'eseguibile tesseract."""
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return False
+    return True
+
+
+BACKENDS = {
+    b.name: b for b in (TextLayerBackend(), LayoutBackend(), TableBackend(), OcrBackend())
+}
+
+
+# ======================================================
+# DOCUMENT
+# ======================================================
+class PdfDocument:
+    """Apre il PDF una volta sola; pdfplumber viene caricato solo se serve."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        with PDFIUM_LOCK:
+            self.pdfium = pdfium.PdfDocument(data)
+        self._plumber = None
+
+    @property
+    def plumber(self):
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(BytesIO(self.data))
+        return self._plumber
+
+    def __len__(self):
+        return len(self.pdfium)
+
+    def page_stats(self, index):
+        """
+        Area della pagina e numero di righe orizzontali/verticali sottili,
+        ricavati dai tracciati vettoriali senza parsing del layout.
+        """
+        horizontal = vertical = 0
+        with PDFIUM_LOCK:
+            page = self.pdfium[index]
+            try:
+                width, height = page.get_size()
+                for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH]):
+                    # get_bounds in pypdfium2 v5, get_pos in v4
+                    bounds = getattr(obj, "get_bounds", None) or obj.get_pos
+                    left, bottom, right, top = bounds()
+                    w, h = right - left, top - bottom
+                    if h <= RULE_MAX_THICKNESS and w >= RULE_MIN_LENGTH:
+                        horizontal += 1
+                    elif w <= RULE_MAX_THICKNESS and h >= RULE_MIN_LENGTH:
+                        vertical += 1
+            finally:
+                page.close()
+        return max(width * height, 1.0), (horizontal, vertical)
+
+    def close(self):
+        if self._plumber is not None:
+            self._plumber.close()
+        with PDFIUM_LOCK:
+            self.pdfium.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ======================================================
+# SELEZIONE AUTOMATICA PER PAGINA
+# ======================================================
+def text_density(text, area):
+    """Caratteri non-spazio per 1000 pt² di pagina."""
+    chars = sum(1 for c in text if not c.isspace())
+    return chars * 1000 / area
+
+
+def choose_backend(fast_text, area, rules=(0, 0)):
+    """Sceglie il backend per una pagina a partire dal text layer già estratto."""
+    density = text_density(fast_text, area)
+    if density < MIN_TEXT_DENSITY:
+        return "ocr" if ocr_available() else "layout"
+    horizontal, vertical = rules
+    if horizontal >= MIN_GRID_LINES and vertical >= MIN_GRID_LINES:
+        return "table"
+    if density < FULL_TEXT_DENSITY:
+        return "layout"
+    return "text"
+
+
+def extract_pages(doc, backend="auto"):
+    """
+    Ritorna (testo di ogni pagina, completo), con backend fisso o scelto per
+    pagina. `completo` è False se almeno una pagina doveva passare dall'OCR
+    e l'OCR non è stato eseguibile.
+    """
+    texts = []
+    complete = True
+    for i in range(len(doc)):
+        fast_text = ""
+        if backend == "auto":
+            fast_text = BACKENDS["text"].extract_page(doc, i)
+            area, rules = doc.page_stats(i)
+            chosen = choose_backend(fast_text, area, rules)
+        else:
+            chosen = backend
+
+        if chosen == "text" and backend == "auto":
+            texts.append(fast_text)
+            continue
+        try:
+            texts.append(BACKENDS[chosen].extract_page(doc, i) or fast_text)
+        except OcrUnavailable:
+            complete = False
+            texts.append(fast_text)
+    return texts, complete
+
+
+# ======================================================
+# CACHE SU DISCO
+# ======================================================
+def read_pdf_bytes(pdf_file):
+    """Accetta path, file-like (es. UploadedFile di Streamlit) o bytes."""
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    if hasattr(pdf_file, "read"):
+        pdf_file.seek(0)
+        return pdf_file.read()
+    with open(pdf_file, "rb") as f:
+        return f.read()
+
+
+def cache_path(data: bytes, backend):
+    digest = hashlib.sha256(data).hexdigest()
+    # In auto il risultato dipende dalla disponibilità dell'OCR
+    if backend == "auto" and ocr_available():
+        backend = "auto-ocr"
+    return os.path.join(PDF_CACHE_DIR, f"{digest}-{backend}-v{CACHE_VERSION}.txt")
+
+
+def write_cache(path, text):
+    """Scrittura atomica e non bloccante: un errore di cache non ferma l'estrazione."""
+    tmp = None
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", newline="", dir=PDF_CACHE_DIR, suffix=".tmp", delete=False
+        ) as f:
+            tmp = f.name
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp and os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        return
+    prune_cache()
+
+
+def prune_cache(max_files=PDF_CACHE_MAX_FILES):
+    """Elimina i file di cache meno recenti oltre il limite."""
+    entries = []
+    for path in glob.glob(os.path.join(PDF_CACHE_DIR, "*.txt")):
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            pass
+    entries.sort()
+    for _, path in entries[: max(len(entries) - max_files, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def extract_text(pdf_file, backend="auto", use_cache=True):
+    """Estrae il testo dal PDF, riusando la cache se il documento è già noto."""
+    if backend != "auto" and backend not in BACKENDS:
+        raise ValueError(f"Backend PDF sconosciuto: {backend}")
+
+    data = read_pdf_bytes(pdf_file)
+    path = cache_path(data, backend)
+    if use_cache:
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        except OSError:
+            text = None
+        if text is not None:
+            try:
+                os.utime(path)  # mantiene il file tra i più recenti per prune_cache
+            except OSError:
+                pass
+            return text
+
+    with PdfDocument(data) as doc:
+        pages, complete = extract_pages(doc, backend)
+    text = "\n".join(pages)
+
+    # Se l'OCR serviva ma non è stato eseguibile il risultato non va in cache,
+    # così una nuova analisi potrà recuperare le pagine scansionate
+    if use_cache and complete:
+        write_cache(path, text)
+    return text
@@ -1,4 +1,3 @@
-import pdfplumber
 import json
 import base64
 import qrcode
@@ -8,6 +7,7 @@ from openai import OpenAI
 import streamlit as st
 from PIL import Image
 import io
+from functions import pdf_extraction
 
 # ======================================================
 # CONFIG
@@ -32,13 +32,14 @@ PRODUCT_FIELDS = {
 # ======================================================
 # PDF / IMAGE UTILITIES
 # ======================================================
-def extract_text_from_pdf(pdf_file):
-    """Estrae tutto il testo da un PDF."""
-    text = ""
-    with pdfplumber.open(pdf_file) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text
+def extract_text_from_pdf(pdf_file, backend="auto", use_cache=True):
+    """
+    Estrae tutto il testo da un PDF.
+    backend: "auto" (scelta per pagina in base alla densità di testo),
+    "text", "layout", "table" o "ocr". Il risultato è messo in cache
+    su disco in base all'hash del PDF.
+    """
+    return pdf_extraction.extract_text(pdf_file, backend=backend, use_cache=use_cache)
 
 def image_to_base64(image_file):
     """Converte un file o un PIL Image in base64 per invio a GPT o salvataggio."""
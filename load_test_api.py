@@ -0,0 +1,149 @@
+"""
+Load test per passport_api.py.
+
+Esegue N richieste con C client concorrenti e riporta richieste/sec e
+latenze (p50, p99, max).
+
+Esempio:
+    python load_test_api.py http://127.0.0.1:8080/passports/MOBILE-1a2b3c4d -n 5000 -c 50
+    python load_test_api.py <url> --gzip --etag   # simula client con cache
+"""
+import argparse
+import http.client
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_target(url):
+    """Ritorna (parti dell'URL, path con query) usati da tutte le richieste."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise SystemExit(f"Schema non supportato: {parts.scheme or '(nessuno)'} (usa http o https)")
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return parts, path
+
+
+def open_connection(parts):
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.hostname, parts.port or 443, timeout=10)
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+
+
+def fetch_etag(url, headers):
+    """Una richiesta iniziale per ottenere l'ETag da rimandare in If-None-Match."""
+    parts, path = parse_target(url)
+    conn = open_connection(parts)
+    try:
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.getheader("ETag")
+    finally:
+        conn.close()
+
+
+def run(url, total, concurrency, headers):
+    parts, path = parse_target(url)
+
+    # Solo le risposte servite (2xx/304) entrano nei percentili principali;
+    # errori e 503 hanno latenze separate
+    latencies = []
+    error_latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        local_lat, local_err, local_status = [], [], Counter()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+
+            start = time.perf_counter()
+            conn = open_connection(parts)
+            served = False
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                local_status[resp.status] += 1
+                served = 200 <= resp.status < 300 or resp.status == 304
+            except (OSError, http.client.HTTPException) as e:
+                local_status[type(e).__name__] += 1
+            finally:
+                conn.close()
+            (local_lat if served else local_err).append(time.perf_counter() - start)
+
+        with lock:
+            latencies.extend(local_lat)
+            error_latencies.extend(local_err)
+            statuses.update(local_status)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    error_latencies.sort()
+    return {
+        "requests": len(latencies) + len(error_latencies),
+        "served": len(latencies),
+        "errors": len(error_latencies),
+        "elapsed": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+        "error_p99": percentile(error_latencies, 99),
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test della Passport API")
+    parser.add_argument("url")
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--gzip", action="store_true", help="invia Accept-Encoding: gzip")
+    parser.add_argument("--etag", action="store_true", help="invia If-None-Match (risposte 304)")
+    args = parser.parse_args()
+
+    headers = {}
+    if args.gzip:
+        headers["Accept-Encoding"] = "gzip"
+    if args.etag:
+        etag = fetch_etag(args.url, headers)
+        if etag:
+            headers["If-None-Match"] = etag
+
+    r = run(args.url, args.requests, args.concurrency, headers)
+    print(f"Richieste:   {r['requests']} in {r['elapsed']:.2f}s ({args.concurrency} client)")
+    print(f"Servite:     {r['served']} (2xx/304), errori: {r['errors']}")
+    print(f"Throughput:  {r['rps']:.1f} req/s servite")
+    print(f"Latenza p50: {r['p50'] * 1000:.2f} ms")
+    print(f"Latenza p99: {r['p99'] * 1000:.2f} ms")
+    print(f"Latenza max: {r['max'] * 1000:.2f} ms")
+    if r["errors"]:
+        print(f"Errori p99:  {r['error_p99'] * 1000:.2f} ms")
+    print("Status:      " + ", ".join(f"{k}={v}" for k, v in sorted(r["statuses"].items(), key=str)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""
+API HTTP read-only per i Digital Product Passport.
+
+Servizio leggero (solo libreria standard) pensato per sistemi retailer e app
+di scansione, in alternativa alla UI Streamlit:
+
+    GET /passports/<id>          JSON del passport, senza immagine inline
+    GET /passports/<id>/image    immagine del prodotto
+    GET /healthz                 stato del servizio
+
+Ogni risposta ha ETag forte, Cache-Control e supporta If-None-Match (304);
+il JSON viene compresso con gzip se il client lo accetta.
+
+Avvio:
+    python passport_api.py --port 8080 --workers 16
+"""
+import argparse
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# ======================================================
+# CONFIG
+# ======================================================
+# Stessa cartella usata da services.save_passport_to_file
+PASSPORT_DIR = os.environ.get("PASSPORT_DIR", "passports")
+IMAGE_KEY = "immagine_base64"
+
+JSON_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+IMAGE_CACHE_CONTROL = "public, max-age=3600"
+GZIP_MIN_SIZE = 512
+# Budget in byte della cache delle risposte (JSON, gzip e immagini decodificate)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Secondi di inattività prima di chiudere una connessione lenta o bloccata
+REQUEST_TIMEOUT = 10
+# Connessioni in attesa per worker; oltre questa soglia si risponde 503
+QUEUE_PER_WORKER = 4
+
+BUSY_RESPONSE = (
+    b"HTTP/1.0 503 Service Unavailable\r\n"
+    b"Content-Type: application/json; charset=utf-8\r\n"
+    b"Content-Length: 26\r\n"
+    b"Cache-Control: no-store\r\n"
+    b"Retry-After: 1\r\n"
+    b"\r\n"
+    b'{"error": "server busy"}\r\n'
+)
+
+PASSPORT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+ROUTE_RE = re.compile(r"^/passports/([^/]+)(/image)?/?$")
+
+
+# ======================================================
+# RAPPRESENTAZIONI (con cache in memoria)
+# ======================================================
+class Representation:
+    """Corpo di una risposta già serializzato, con ETag e variante gzip."""
+
+    def __init__(self, body: bytes, content_type, cache_control, compressible):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        self.gzip_body = None
+        self.gzip_etag = None
+        if compressible and len(body) >= GZIP_MIN_SIZE:
+            self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+            self.gzip_etag = self.etag[:-1] + '-gz"'
+
+    @property
+    def size(self):
+        return len(self.body) + len(self.gzip_body or b"")
+
+
+def image_content_type(data: bytes):
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def decode_image(image_b64):
+    """Decodifica l'immagine inline; None se assente o non valida."""
+    if not image_b64:
+        return None
+    try:
+        return base64.b64decode(image_b64, validate=True)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+
+
+def build_representations(passport, passport_id):
+    """Separa il JSON pubblico dall'immagine inline del passport."""
+    passport = dict(passport)
+    image = None
+    if isinstance(passport.get("data_source_image"), dict):
+        image_data = dict(passport["data_source_image"])
+        image = decode_image(image_data.pop(IMAGE_KEY, None))
+        if image:
+            image_data["image_url"] = f"/passports/{passport_id}/image"
+        passport["data_source_image"] = image_data
+
+    body = json.dumps(passport, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    reps = {
+        "json": Representation(
+            body, "application/json; charset=utf-8", JSON_CACHE_CONTROL, compressible=True
+        )
+    }
+    if image:
+        reps["image"] = Representation(
+            image, image_content_type(image), IMAGE_CACHE_CONTROL, compressible=False
+        )
+    return reps
+
+
+class PassportStore:
+    """
+    Legge i passport da disco e tiene in LRU le rappresentazioni già pronte,
+    entro un budget di byte (le immagini possono pesare diversi MB).
+    """
+
+    def __init__(self, directory=PASSPORT_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, passport_id, kind):
+        """Ritorna la Representation richiesta, o None se non esiste."""
+        if not PASSPORT_ID_RE.match(passport_id):
+            return None
+        path = os.path.join(self.directory, f"{passport_id}.json")
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        # Il file può essere riscritto: la chiave include mtime e dimensione
+        key = (passport_id, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            reps = self._cache.get(passport_id)
+            if reps is not None and reps[0] == key:
+                self._cache.move_to_end(passport_id)
+                return reps[1].get(kind)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                passport = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(passport, dict):
+            return None
+        built = build_representations(passport, passport_id)
+        size = sum(rep.size for rep in built.values())
+
+        with self._lock:
+            old = self._cache.pop(passport_id, None)
+            if old is not None:
+                self._bytes -= old[2]
+            # Un passport più grande dell'intero budget non viene messo in cache
+            if size <= self.max_bytes:
+                self._cache[passport_id] = (key, built, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._bytes -= evicted[2]
+        return built.get(kind)
+
+
+# ======================================================
+# HTTP
+# ======================================================
+def accepts_gzip(header):
+    """
+    True se Accept-Encoding ammette gzip (q diverso da 0).
+    Una voce esplicita "gzip" prevale sempre su "*".
+    """
+    qvalues = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding] = q
+    q = qvalues.get("gzip", qvalues.get("*", 0.0))
+    return q > 0
+
+
+def etag_matches(header, etags):
+    """Confronto debole di If-None-Match (RFC 9110) contro gli ETag correnti."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return any(e in candidates for e in etags)
+
+
+class PassportHandler(BaseHTTPRequestHandler):
+    server_version = "NuviaPassportAPI/1.0"
+    # Rispettato da StreamRequestHandler: libera il worker dai client inattivi
+    timeout = REQUEST_TIMEOUT
+    store = None
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def send_response(self, code, message=None):
+        self._response_started = True
+        super().send_response(code, message)
+
+    def _handle(self, send_body):
+        """
+        Esegue la richiesta; un errore imprevisto diventa un 500 JSON, oppure
+        chiude la connessione se la risposta era già iniziata.
+        """
+        self._response_started = False
+        try:
+            self._serve(send_body)
+        except (ConnectionError, TimeoutError):
+            raise
+        except Exception:
+            self.server.handle_error(self.request, self.client_address)
+            if self._response_started:
+                self.close_connection = True
+                return
+            try:
+                self._send_simple(500, {"error": "internal server error"}, send_body)
+            except OSError:
+                pass
+
+    def _serve(self, send_body):
+        path = self.path.split("?", 1)[0]
+        if path == "/healthz":
+            self._send_simple(200, {"status": "ok"}, send_body)
+            return
+
+        match = ROUTE_RE.match(path)
+        if not match:
+            self._send_simple(404, {"error": "not found"}, send_body)
+            return
+
+        passport_id, image = match.groups()
+        rep = self.store.get(passport_id, "image" if image else "json")
+        if rep is None:
+            self._send_simple(404, {"error": "passport or image not found"}, send_body)
+            return
+
+        use_gzip = rep.gzip_body is not None and accepts_gzip(self.headers.get("Accept-Encoding"))
+        etag = rep.gzip_etag if use_gzip else rep.etag
+        etags = tuple(e for e in (rep.etag, rep.gzip_etag) if e)
+
+        if etag_matches(self.headers.get("If-None-Match"), etags):
+            self.send_response(304)
+            self._send_cache_headers(rep, etag)
+            self.end_headers()
+            return
+
+        body = rep.gzip_body if use_gzip else rep.body
+        self.send_response(200)
+        self.send_header("Content-Type", rep.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self._send_cache_headers(rep, etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_cache_headers(self, rep, etag):
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", rep.cache_control)
+        if rep.gzip_body is not None:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def _send_simple(self, status, payload, send_body):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer che gestisce le connessioni con un pool di worker fisso.
+    Le connessioni in attesa sono limitate: oltre la soglia si risponde 503.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, address, handler, workers=16, quiet=False):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="passport-api")
+        self.slots = threading.BoundedSemaphore(workers * (1 + QUEUE_PER_WORKER))
+        self.quiet = quiet
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self._reject(request)
+            return
+        self.pool.submit(self._process, request, client_address)
+
+    def _reject(self, request):
+        try:
+            request.settimeout(1)
+            request.sendall(BUSY_RESPONSE)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_server(host="127.0.0.1", port=8080, workers=16, directory=PASSPORT_DIR, quiet=False):
+    handler = type("Handler", (PassportHandler,), {"store": PassportStore(directory)})
+    return PooledHTTPServer((host, port), handler, workers=workers, quiet=quiet)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API read-only dei Digital Product Passport")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--dir", default=PASSPORT_DIR, help="cartella dei passport JSON")
+    parser.add_argument("--quiet", action="store_true", help="disattiva il log delle richieste")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.dir, args.quiet)
+    print(f"Passport API su http://{args.host}:{args.port} ({args.workers} worker)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()